@@ -1,10 +1,9 @@
 import numpy as np
-from collections import defaultdict
-from itertools import combinations
+import pandas as pd
 from importlib.resources import files
 
 from AnyQt.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QWidget, QScrollArea
-from AnyQt.QtCore import Qt
+from AnyQt.QtCore import Qt, QTimer
 
 import Orange
 from Orange.data import Table, Domain, DiscreteVariable, ContinuousVariable, StringVariable
@@ -12,6 +11,96 @@ from Orange.widgets import widget, gui, settings
 from Orange.widgets.utils.widgetpreview import WidgetPreview
 from Orange.widgets.widget import OWWidget, Input, Output, Msg
 
+try:
+    from numba import njit, prange, get_num_threads
+except ImportError:
+    njit = None
+
+
+# Kernels are compiled for a single signature, so they are built (or loaded
+# from the on-disk cache) once at import and never specialized again when
+# the aggregation methods change; the methods are passed as runtime codes
+if njit is not None:
+    @njit("void(int64[:], int64[:], int64[:], int64[:], int64[:], int64[:])",
+          cache=True, parallel=True)
+    def _pairs_from_sorted(sorted_sources, group_starts, group_ends, group_offsets,
+                           out_left, out_right):
+        """Write every pair of sources within each group.
+        
+        Sources must be distinct inside each group. The pairs of group g are
+        written from group_offsets[g] on, so groups are filled in parallel.
+        """
+        for g in prange(len(group_starts)):
+            p = group_offsets[g]
+            start = group_starts[g]
+            end = group_ends[g]
+            for a in range(start, end):
+                for b in range(a + 1, end):
+                    out_left[p] = sorted_sources[a]
+                    out_right[p] = sorted_sources[b]
+                    p += 1
+
+    @njit("float64[:, :](float64[:, :], int64[:], int64[:], int64[:], int64[:], int8[:], int64)",
+          cache=True, parallel=True)
+    def _aggregate_segments(values, slice_starts, slice_ends, segment_starts, segment_ends,
+                            method_codes, n_threads):
+        """Aggregate every column of values over segments of row slices.
+        
+        Segment g is made of the row slices slice_starts[k]:slice_ends[k] for
+        k in segment_starts[g]:segment_ends[g]. NaNs are ignored and empty
+        segments give NaN. method_codes holds, for each column, the position
+        of its method in AGG_METHODS. Segments are dealt round-robin to
+        n_threads workers.
+        """
+        out = np.full((len(segment_starts), values.shape[1]), np.nan)
+        max_rows = 0
+        for g in range(len(segment_starts)):
+            rows = 0
+            for k in range(segment_starts[g], segment_ends[g]):
+                rows += slice_ends[k] - slice_starts[k]
+            max_rows = max(max_rows, rows)
+        # Each worker has its own buffer for the non-missing values of one segment
+        for t in prange(n_threads):
+            scratch = np.empty(max_rows)
+            for g in range(t, len(segment_starts), n_threads):
+                for c in range(values.shape[1]):
+                    # Copy the non-missing values in a single pass over the slices
+                    n = 0
+                    for k in range(segment_starts[g], segment_ends[g]):
+                        for r in range(slice_starts[k], slice_ends[k]):
+                            value = values[r, c]
+                            if not np.isnan(value):
+                                scratch[n] = value
+                                n += 1
+                    if n == 0:
+                        continue
+                    segment = scratch[:n]
+                    code = method_codes[c]
+                    if code == 0:
+                        out[g, c] = segment[0]
+                    elif code == 1:
+                        out[g, c] = segment[-1]
+                    elif code == 3:
+                        out[g, c] = np.sum(segment)
+                    elif code == 4:
+                        out[g, c] = segment.size
+                    elif code == 5:
+                        out[g, c] = np.max(segment)
+                    elif code == 6:
+                        out[g, c] = np.min(segment)
+                    elif code == 7:
+                        out[g, c] = np.median(segment)
+                    elif code == 8:
+                        out[g, c] = np.std(segment)
+                    elif code == 9:
+                        out[g, c] = np.var(segment)
+                    else:
+                        out[g, c] = np.mean(segment)
+        return out
+else:
+    _pairs_from_sorted = None
+    _aggregate_segments = None
+
 
 class OWElementsPairing(OWWidget):
     name = "Elements Pairing"
@@ -40,6 +129,20 @@ class OWElementsPairing(OWWidget):
         "max", "min", "median", "std", "var"
     ]
     
+    # Reducers for each aggregation method, applied to non-missing values
+    AGG_FUNCTIONS = {
+        "first": lambda values: values[0],
+        "last": lambda values: values[-1],
+        "mean": np.mean,
+        "sum": np.sum,
+        "count": len,
+        "max": np.max,
+        "min": np.min,
+        "median": np.median,
+        "std": np.std,
+        "var": np.var,
+    }
+    
     class Error(OWWidget.Error):
         no_data = Msg("No data on input")
         no_columns = Msg("Data must have at least 2 columns")
@@ -52,8 +155,20 @@ class OWElementsPairing(OWWidget):
         self.data = None
         self.numeric_columns = []
         self.aggregation_combos = {}
+        self._col_index = {}  # Column name -> (section, index, variable)
+        self._col_names = []  # Column names: attributes, metas, class variable
+        self._updating_combos = False  # Suppress callbacks while repopulating combos
+        self._last_run = None  # Inputs of the last successfully sent output
+        self._group_cache_key = None  # Inputs of the cached aggregation grouping
+        self._group_cache = None
         self._first_auto_generate = True  # Track first automatic generation
         
+        # Coalesce rapid setting changes into a single recomputation
+        self._recompute_timer = QTimer(self)
+        self._recompute_timer.setSingleShot(True)
+        self._recompute_timer.setInterval(150)
+        self._recompute_timer.timeout.connect(self.process_data)
+        
         # GUI
         box = gui.widgetBox(self.controlArea, "Column Selection")
         
@@ -111,6 +226,11 @@ class OWElementsPairing(OWWidget):
     def set_data(self, data):
         self.Error.clear()
         self.data = data
+        self._col_index = {}
+        self._col_names = []
+        self._last_run = None
+        self._group_cache_key = None
+        self._group_cache = None
         
         if data is None:
             self.Error.no_data()
@@ -128,6 +248,17 @@ class OWElementsPairing(OWWidget):
             self.Outputs.data.send(None)
             return
         
+        # Index all columns by name once per input table
+        for i, attr in enumerate(data.domain.attributes):
+            self._col_index[attr.name] = ("X", i, attr)
+        for i, meta in enumerate(data.domain.metas):
+            self._col_index[meta.name] = ("M", i, meta)
+        if data.domain.class_var:
+            self._col_index[data.domain.class_var.name] = ("Y", 0, data.domain.class_var)
+        self._col_names = [var.name for var in data.domain.attributes + data.domain.metas]
+        if data.domain.class_var:
+            self._col_names.append(data.domain.class_var.name)
+        
         self.update_combos()
         self.update_numeric_columns()
         self.update_aggregation_controls()
@@ -153,32 +284,30 @@ class OWElementsPairing(OWWidget):
         self.aggregation_combos.clear()
     
     def update_combos(self):
-        self.source_combo.clear()
-        self.target_combo.clear()
-        
-        if self.data is None:
-            return
-        
-        # Get all columns (attributes + metas)
-        columns = []
-        for attr in self.data.domain.attributes:
-            columns.append(attr.name)
-        for meta in self.data.domain.metas:
-            columns.append(meta.name)
-        
-        # Add class variable if exists
-        if self.data.domain.class_var:
-            columns.append(self.data.domain.class_var.name)
-        
-        self.source_combo.addItems(columns)
-        self.target_combo.addItems(columns)
-        
-        # Set default selections if settings exist
-        if self.source_column and self.source_column in columns:
-            self.source_combo.setCurrentText(self.source_column)
-        
-        if self.target_column and self.target_column in columns:
-            self.target_combo.setCurrentText(self.target_column)
+        # Repopulate both combos without emitting signals for every change
+        self._updating_combos = True
+        self.source_combo.blockSignals(True)
+        self.target_combo.blockSignals(True)
+        try:
+            self.source_combo.clear()
+            self.target_combo.clear()
+            
+            if self.data is None:
+                return
+            
+            self.source_combo.addItems(self._col_names)
+            self.target_combo.addItems(self._col_names)
+            
+            # Set default selections if settings exist
+            if self.source_column and self.source_column in self._col_index:
+                self.source_combo.setCurrentText(self.source_column)
+            
+            if self.target_column and self.target_column in self._col_index:
+                self.target_combo.setCurrentText(self.target_column)
+        finally:
+            self.source_combo.blockSignals(False)
+            self.target_combo.blockSignals(False)
+            self._updating_combos = False
     
     def update_numeric_columns(self):
         """Identify numeric columns (excluding source and target)"""
@@ -258,15 +387,17 @@ class OWElementsPairing(OWWidget):
         """Save aggregation method when changed"""
         self.aggregation_methods[column_name] = method
         if self.data is not None and self.auto_generate:
-            self.process_data()
+            self._recompute_timer.start()
     
     def on_source_target_changed(self):
         """Handle source/target column change"""
-        if self.data is not None:
-            self.update_numeric_columns()
-            self.update_aggregation_controls()
-            if self.auto_generate:
-                self.process_data()
+        if self._updating_combos or self.data is None:
+            return
+        
+        self.update_numeric_columns()
+        self.update_aggregation_controls()
+        if self.auto_generate and self.source_column and self.target_column:
+            self._recompute_timer.start()
     
     def on_auto_generate_changed(self):
         """Handle auto-generate checkbox change"""
@@ -279,9 +410,7 @@ class OWElementsPairing(OWWidget):
             return
         
         rows = len(self.data)
-        cols = len(self.data.domain.attributes) + len(self.data.domain.metas)
-        if self.data.domain.class_var:
-            cols += 1
+        cols = len(self._col_names)
         
         num_agg = len(self.numeric_columns)
         self.info_label.setText(
@@ -291,56 +420,68 @@ class OWElementsPairing(OWWidget):
     
     def get_column_data(self, column_name):
         """Get data from a column by name"""
-        if not column_name:
+        if not column_name or column_name not in self._col_index:
             return None
         
-        # Check attributes
-        for i, attr in enumerate(self.data.domain.attributes):
-            if attr.name == column_name:
-                return self.data.X[:, i]
+        section, i, var = self._col_index[column_name]
         
-        # Check metas
-        for i, meta in enumerate(self.data.domain.metas):
-            if meta.name == column_name:
-                return self.data.metas[:, i]
+        # Orange >= 3.34 returns a view where possible and densifies sparse columns
+        if hasattr(self.data, "get_column"):
+            return self.data.get_column(var)
         
-        # Check class variable
-        if self.data.domain.class_var and self.data.domain.class_var.name == column_name:
-            return self.data.Y
-        
-        return None
-    
+        if section == "X":
+            return self.data.X[:, i]
+        if section == "M":
+            return self.data.metas[:, i]
+        return self.data.Y
+
+    def _valid_mask(self, values):
+        """Boolean mask of the non-missing entries of a column"""
+        if values.dtype.kind in "fiu":
+            return ~np.isnan(values)
+        return ~pd.isnull(values) & (values != "")
+
+    def _typed_column(self, values, var):
+        """Return column values as float for discrete/continuous variables"""
+        if var is not None and var.is_primitive():
+            return values.astype(float, copy=False)
+        return values
+
+    def _encode_column(self, values, var):
+        """Encode column values as integer codes, -1 for missing entries.
+        
+        Returns the array of distinct values and the code of every entry.
+        Discrete variables already hold codes, so they are only cast.
+        """
+        missing = ~self._valid_mask(values)
+        if isinstance(var, DiscreteVariable):
+            codes = np.where(missing, -1, values).astype(np.intp)
+            return np.arange(len(var.values), dtype=float), codes
+        
+        codes = np.full(len(values), -1, dtype=np.intp)
+        uniques, codes[~missing] = np.unique(values[~missing], return_inverse=True)
+        return uniques, codes
+
     def apply_aggregation(self, values, method):
-        """Apply aggregation method to list of values"""
-        values = [v for v in values if not (isinstance(v, float) and np.isnan(v))]
+        """Apply aggregation method to an array of values, ignoring NaNs"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
         
-        if not values:
+        if values.size == 0:
             return np.nan
         
-        if method == "first":
-            return values[0]
-        elif method == "last":
-            return values[-1]
-        elif method == "mean":
-            return np.mean(values)
-        elif method == "sum":
-            return np.sum(values)
-        elif method == "count":
-            return len(values)
-        elif method == "max":
-            return np.max(values)
-        elif method == "min":
-            return np.min(values)
-        elif method == "median":
-            return np.median(values)
-        elif method == "std":
-            return np.std(values)
-        elif method == "var":
-            return np.var(values)
-        else:
-            return np.mean(values)  # Default
+        return self.AGG_FUNCTIONS.get(method, np.mean)(values)
     
     def process_data(self):
+        # Skip if nothing changed since the last successful output
+        run_key = (
+            id(self.data), self.source_column, self.target_column,
+            tuple((col, self.aggregation_methods.get(col, "mean")) for col in self.numeric_columns)
+        )
+        if run_key == self._last_run:
+            return
+        self._last_run = None
+        
         self.Error.clear()
         
         if self.data is None:
@@ -364,296 +505,321 @@ class OWElementsPairing(OWWidget):
             self.Outputs.data.send(None)
             return
         
+        # Fix the column dtypes once: discrete and continuous columns are
+        # processed as float arrays (codes for discrete), strings as objects
+        source_var = self._get_variable_by_name(self.source_column)
+        target_var = self._get_variable_by_name(self.target_column)
+        source_data = self._typed_column(source_data, source_var)
+        target_data = self._typed_column(target_data, target_var)
+        
         # Check if there are numeric columns to aggregate
         has_numeric = len(self.numeric_columns) > 0
         
         if has_numeric:
             # Original logic with aggregation
-            output_table = self._process_with_aggregation(source_data, target_data)
+            output_table = self._process_with_aggregation(
+                source_data, target_data, source_var, target_var
+            )
         else:
             # New logic without aggregation - just pair sources that share targets
-            output_table = self._process_without_aggregation(source_data, target_data)
+            output_table = self._process_without_aggregation(
+                source_data, target_data, source_var, target_var
+            )
         
         if output_table is None:
             self.Error.no_pairs()
             self.Outputs.data.send(None)
         else:
             self.Outputs.data.send(output_table)
+            self._last_run = run_key
     
-    def _process_without_aggregation(self, source_data, target_data):
+    def _process_without_aggregation(self, source_data, target_data, source_var, target_var):
         """Process pairing when there are no numeric columns to aggregate"""
-        # Build structure: source -> set of targets
-        source_targets = defaultdict(set)
-        
-        for i in range(len(self.data)):
-            source_val = source_data[i]
-            target_val = target_data[i]
-            
-            # Skip missing values
-            if isinstance(source_val, (int, float)) and np.isnan(source_val):
-                continue
-            if source_val == "" or source_val is None:
-                continue
-            if isinstance(target_val, (int, float)) and np.isnan(target_val):
-                continue
-            if target_val == "" or target_val is None:
-                continue
-            
-            source_targets[source_val].add(target_val)
-        
-        # Find pairs of sources that share targets
-        all_sources = list(source_targets.keys())
-        pairs = []
-        shared_targets_list = []
-        
-        for source1, source2 in combinations(all_sources, 2):
-            targets1 = source_targets[source1]
-            targets2 = source_targets[source2]
-            shared = targets1 & targets2
-            
-            if shared:
-                pairs.append([source1, source2])
-                shared_targets_list.append(len(shared))
-        
-        if not pairs:
+        grouped = self._pair_cells(source_data, target_data, source_var, target_var)
+        if grouped is None:
             return None
-        
-        # Create output table
-        pairs_array = np.array(pairs, dtype=object)
-        
-        # Determine variable types based on source column
-        source_var = self._get_variable_by_name(self.source_column)
-        
-        # Create variables for the output table
-        metas = []
-        attributes = []
-        
-        # Source columns
-        if isinstance(source_var, DiscreteVariable):
-            source1_var = DiscreteVariable("Source1", values=source_var.values)
-            source2_var = DiscreteVariable("Source2", values=source_var.values)
-            metas.extend([source1_var, source2_var])
-        elif isinstance(source_var, ContinuousVariable):
-            source1_var = ContinuousVariable("Source1")
-            source2_var = ContinuousVariable("Source2")
-            attributes.extend([source1_var, source2_var])
-        else:
-            # String or other type
-            source1_var = StringVariable("Source1")
-            source2_var = StringVariable("Source2")
-            metas.extend([source1_var, source2_var])
+        source_values, _, _, cell_sources, left, right = grouped
+
+        # Count, for every pair of sources, how many targets they share
+        n_sources = len(source_values)
+        pair_keys, shared_targets_list = np.unique(
+            cell_sources[left] * n_sources + cell_sources[right], return_counts=True
+        )
+        left = pair_keys // n_sources
+        right = pair_keys % n_sources
+
+        pairs_array = np.column_stack([source_values[left], source_values[right]])
         
         # Add shared targets count as an attribute
-        shared_count_var = ContinuousVariable("Shared_Targets_Count")
-        attributes.append(shared_count_var)
+        return self._create_output_table(
+            source_var, pairs_array,
+            [ContinuousVariable("Shared_Targets_Count")],
+            shared_targets_list.astype(float).reshape(-1, 1)
+        )
+    
+    def _pair_cells(self, source_data, target_data, source_var, target_var):
+        """Sort rows into (target, source) cells and pair the cells of each target.
+        
+        Returns the distinct source values, the input rows in sorted order,
+        the start of every cell in that order, the source code of every cell,
+        and the two cells of every pair; None if no target has two sources.
+        """
+        # Encode sources and targets as integer codes and skip rows where
+        # either is missing
+        source_values, source_codes = self._encode_column(source_data, source_var)
+        _, target_codes = self._encode_column(target_data, target_var)
+        rows = np.flatnonzero((source_codes >= 0) & (target_codes >= 0))
+
+        if len(rows) == 0:
+            return None
+
+        # Number targets in order of appearance so that first/last follow
+        # the input order
+        source_codes = source_codes[rows]
+        target_codes = self._first_seen_codes(target_codes[rows])
+
+        # Sort rows by target, then source; the sort is stable, so the rows
+        # of every (target, source) cell stay in input order
+        order = np.lexsort((source_codes, target_codes))
+        rows = rows[order]
+        source_codes = source_codes[order]
+        target_codes = target_codes[order]
+
+        cell_starts = np.flatnonzero(np.r_[True, (source_codes[1:] != source_codes[:-1]) |
+                                                 (target_codes[1:] != target_codes[:-1])])
+        cell_sources = source_codes[cell_starts]
+
+        # Cells of a target are a contiguous slice; targets with a single
+        # source cannot produce pairs
+        group_sizes = np.bincount(target_codes[cell_starts])
+        group_ends = np.cumsum(group_sizes)
+        group_starts = group_ends - group_sizes
+        paired = group_sizes > 1
+        if not paired.any():
+            return None
+        left, right = self._pairs_within_groups(
+            np.arange(len(cell_starts)),
+            group_sizes[paired], group_starts[paired], group_ends[paired]
+        )
+
+        return source_values, rows, cell_starts, cell_sources, left, right
+    
+    def _pairs_within_groups(self, items, group_sizes, group_starts, group_ends):
+        """Every pair (a, b), a before b, of items within each group slice"""
+        # Buffers are sized from the group sizes, k * (k - 1) / 2 per group
+        group_pairs = (group_sizes * (group_sizes - 1) // 2).astype(np.int64)
+        group_offsets = np.cumsum(group_pairs) - group_pairs
+        n_pairs = int(np.sum(group_pairs))
+        items = items.astype(np.int64, copy=False)
+        left = np.empty(n_pairs, dtype=np.int64)
+        right = np.empty(n_pairs, dtype=np.int64)
+        if _pairs_from_sorted is not None:
+            _pairs_from_sorted(
+                items, group_starts.astype(np.int64, copy=False),
+                group_ends.astype(np.int64, copy=False), group_offsets, left, right
+            )
+        else:
+            for start, end, p in zip(group_starts, group_ends, group_offsets):
+                group_items = items[start:end]
+                i, j = np.triu_indices(len(group_items), 1)
+                left[p:p + len(i)] = group_items[i]
+                right[p:p + len(i)] = group_items[j]
+        return left, right
+    
+    def aggregate_segments(self, values, slice_starts, slice_ends,
+                           segment_starts, segment_ends, methods):
+        """Aggregate each column of values over segments of row slices"""
+        if _aggregate_segments is not None:
+            method_codes = np.array(
+                [self.AGG_METHODS.index(m if m in self.AGG_FUNCTIONS else "mean") for m in methods],
+                dtype=np.int8
+            )
+            return _aggregate_segments(
+                np.ascontiguousarray(values, dtype=np.float64),
+                slice_starts.astype(np.int64, copy=False), slice_ends.astype(np.int64, copy=False),
+                segment_starts.astype(np.int64, copy=False), segment_ends.astype(np.int64, copy=False),
+                method_codes, get_num_threads()
+            )
         
-        # Prepare data arrays
-        X_data = []
-        metas_data = []
+        # Without numba, lay the rows of all segments out one after another
+        # and reduce each column over the segment offsets with ufunc.reduceat;
+        # segments are never empty, as every pair has rows
+        slice_lengths = slice_ends - slice_starts
+        slice_offsets = np.r_[0, np.cumsum(slice_lengths)]
+        rows = np.arange(slice_offsets[-1]) + np.repeat(slice_starts - slice_offsets[:-1], slice_lengths)
+        segment_offsets = slice_offsets[segment_starts]
+        segment_ids = np.repeat(
+            np.arange(len(segment_starts)), slice_offsets[segment_ends] - segment_offsets
+        )
         
-        for i, pair in enumerate(pairs):
-            row_attrs = []
-            row_metas = []
-            
-            # Handle source columns
-            if isinstance(source_var, StringVariable) or source_var is None:
-                row_metas.extend(pair)
-            elif isinstance(source_var, DiscreteVariable):
-                try:
-                    idx1 = source_var.values.index(str(pair[0]))
-                    idx2 = source_var.values.index(str(pair[1]))
-                    row_metas.extend([idx1, idx2])
-                except ValueError:
-                    row_metas.extend([np.nan, np.nan])
+        aggregated = np.empty((len(segment_starts), values.shape[1]))
+        for c, method in enumerate(methods):
+            aggregated[:, c] = self._reduce_flat(values[rows, c], segment_ids, segment_offsets, method)
+        return aggregated
+    
+    def _reduce_flat(self, x, segment_ids, segment_offsets, method):
+        """Aggregate consecutive segments of x, ignoring NaNs, with NumPy"""
+        valid = ~np.isnan(x)
+        count = np.add.reduceat(valid, segment_offsets).astype(float)
+        total = np.add.reduceat(np.where(valid, x, 0), segment_offsets)
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if method == "sum":
+                result = total
+            elif method == "count":
+                result = count
+            elif method == "max":
+                result = np.maximum.reduceat(np.where(valid, x, -np.inf), segment_offsets)
+            elif method == "min":
+                result = np.minimum.reduceat(np.where(valid, x, np.inf), segment_offsets)
+            elif method in ("first", "last"):
+                positions = np.arange(len(x))
+                if method == "first":
+                    picked = np.minimum.reduceat(np.where(valid, positions, len(x) - 1), segment_offsets)
+                else:
+                    picked = np.maximum.reduceat(np.where(valid, positions, 0), segment_offsets)
+                result = x[picked]
+            elif method == "median":
+                # NaNs sort last within each segment
+                ordered = x[np.lexsort((x, segment_ids))]
+                low = segment_offsets + np.maximum(count.astype(int) - 1, 0) // 2
+                high = segment_offsets + count.astype(int) // 2
+                result = (ordered[low] + ordered[high]) / 2
+            elif method in ("std", "var"):
+                mean = total / count
+                deviations = np.where(valid, x - mean[segment_ids], 0)
+                result = np.add.reduceat(deviations ** 2, segment_offsets) / count
+                if method == "std":
+                    result = np.sqrt(result)
             else:
-                row_attrs.extend(pair)
-            
-            # Add shared targets count
-            row_attrs.append(shared_targets_list[i])
-            
-            X_data.append(row_attrs)
-            metas_data.append(row_metas)
+                result = total / count
         
-        # Create domain and table
-        domain = Domain(attributes, metas=metas)
+        result[count == 0] = np.nan
+        return result
+    
+    def _first_seen_codes(self, codes):
+        """Renumber codes in order of first appearance"""
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        rank = np.empty(len(first), dtype=np.intp)
+        rank[np.argsort(first)] = np.arange(len(first))
+        return rank[inverse]
+    
+    def _process_with_aggregation(self, source_data, target_data, source_var, target_var):
+        """Pair sources that share targets and aggregate their numeric columns"""
+        methods = [self.aggregation_methods.get(col, "mean") for col in self.numeric_columns]
+        
+        # The grouping does not depend on the aggregation methods, so it is
+        # reused when only a method changes
+        group_key = (
+            id(self.data), self.source_column, self.target_column, tuple(self.numeric_columns)
+        )
+        if group_key != self._group_cache_key:
+            self._group_cache = self._group_for_aggregation(
+                source_data, target_data, source_var, target_var
+            )
+            self._group_cache_key = group_key
         
-        X_array = np.array(X_data, dtype=float) if X_data and X_data[0] else np.empty((len(pairs), 0))
-        metas_array = np.array(metas_data, dtype=object) if metas_data and metas_data[0] else np.empty((len(pairs), 0))
+        if self._group_cache is None:
+            return None
+        values, slice_starts, slice_ends, pair_starts, pair_ends, pairs_array = self._group_cache
         
-        output_table = Table.from_numpy(
-            domain=domain,
-            X=X_array,
-            metas=metas_array
+        # Aggregate every pair over all rows of both sources at all of their
+        # shared targets at once
+        aggregated_array = self.aggregate_segments(
+            values, slice_starts, slice_ends, pair_starts, pair_ends, methods
         )
         
-        return output_table
-    
-    def _process_with_aggregation(self, source_data, target_data):
-        """Original processing logic with aggregation"""
-        # Get numeric column data
-        numeric_data = {}
-        for col_name in self.numeric_columns:
-            numeric_data[col_name] = self.get_column_data(col_name)
-        
-        # Build structure: source -> target -> {numeric_col: values}
-        source_target_data = defaultdict(lambda: defaultdict(lambda: {col: [] for col in self.numeric_columns}))
+        # Aggregated numeric columns
+        aggregated_vars = [
+            ContinuousVariable(f"{col_name}_{method}")
+            for col_name, method in zip(self.numeric_columns, methods)
+        ]
         
-        for i in range(len(self.data)):
-            source_val = source_data[i]
-            target_val = target_data[i]
-            
-            # Skip missing values
-            if isinstance(source_val, (int, float)) and np.isnan(source_val):
-                continue
-            if source_val == "" or source_val is None:
-                continue
-            if isinstance(target_val, (int, float)) and np.isnan(target_val):
-                continue
-            if target_val == "" or target_val is None:
-                continue
-            
-            # Store numeric values for this source-target pair
-            for col_name in self.numeric_columns:
-                value = numeric_data[col_name][i]
-                source_target_data[source_val][target_val][col_name].append(value)
-        
-        # Now build pairs: find sources that share targets
-        pair_data = defaultdict(lambda: defaultdict(lambda: {col: [] for col in self.numeric_columns}))
-        
-        # Get all sources
-        all_sources = list(source_target_data.keys())
-        
-        # For each pair of sources
-        for source1, source2 in combinations(all_sources, 2):
-            # Find shared targets
-            targets1 = set(source_target_data[source1].keys())
-            targets2 = set(source_target_data[source2].keys())
-            shared_targets = targets1 & targets2
-            
-            if shared_targets:
-                # For each shared target, aggregate the numeric values
-                for target in shared_targets:
-                    for col_name in self.numeric_columns:
-                        values1 = source_target_data[source1][target][col_name]
-                        values2 = source_target_data[source2][target][col_name]
-                        
-                        method = self.aggregation_methods.get(col_name, "mean")
-                        
-                        # Aggregate values for source1 and source2 at this target
-                        agg1 = self.apply_aggregation(values1, method)
-                        agg2 = self.apply_aggregation(values2, method)
-                        
-                        # Combine the two aggregated values
-                        combined = self.apply_aggregation([agg1, agg2], method)
-                        
-                        # Store for this pair and target
-                        pair_data[(source1, source2)][target][col_name] = combined
-        
-        if not pair_data:
+        return self._create_output_table(source_var, pairs_array, aggregated_vars, aggregated_array)
+    
+    def _group_for_aggregation(self, source_data, target_data, source_var, target_var):
+        """Group the rows of every source pair at their shared targets.
+        
+        Returns the sorted numeric block, the row slices of the pair cells in
+        pair order, the range of slices of every pair, and the source values
+        of the pairs; None if nothing pairs.
+        """
+        grouped = self._pair_cells(source_data, target_data, source_var, target_var)
+        if grouped is None:
             return None
+        source_values, rows, cell_starts, cell_sources, left, right = grouped
+        cell_ends = np.r_[cell_starts[1:], len(rows)]
+        
+        # Gather the numeric columns of the sorted rows into one
+        # preallocated float block
+        values = np.empty((len(rows), len(self.numeric_columns)))
+        for c, col_name in enumerate(self.numeric_columns):
+            values[:, c] = self.get_column_data(col_name)[rows]
+        
+        # Group the shared targets by pair; the stable sort keeps the
+        # targets of a pair in order
+        n_sources = len(source_values)
+        pair_keys = cell_sources[left] * n_sources + cell_sources[right]
+        pair_order = np.argsort(pair_keys, kind="stable")
+        pair_keys = pair_keys[pair_order]
+        left = left[pair_order]
+        right = right[pair_order]
+        pair_starts = np.flatnonzero(np.r_[True, pair_keys[1:] != pair_keys[:-1]])
+        pair_ends = np.r_[pair_starts[1:], len(pair_keys)]
+        
+        # Rows of each pair: at every shared target, the cell of the first
+        # source followed by the cell of the second
+        slice_starts = np.column_stack([cell_starts[left], cell_starts[right]]).ravel()
+        slice_ends = np.column_stack([cell_ends[left], cell_ends[right]]).ravel()
+        
+        pair_keys = pair_keys[pair_starts]
+        pairs_array = np.column_stack(
+            [source_values[pair_keys // n_sources], source_values[pair_keys % n_sources]]
+        )
         
-        # Now aggregate across all shared targets for each pair
-        pairs = []
-        aggregated_values = {col: [] for col in self.numeric_columns}
-        
-        for (source1, source2), targets_dict in pair_data.items():
-            pairs.append([source1, source2])
-            
-            # For each numeric column, aggregate across all shared targets
-            for col_name in self.numeric_columns:
-                method = self.aggregation_methods.get(col_name, "mean")
-                
-                # Collect the combined values for each shared target
-                target_values = [targets_dict[target][col_name] for target in targets_dict]
-                
-                # Aggregate across all shared targets
-                final_agg = self.apply_aggregation(target_values, method)
-                aggregated_values[col_name].append(final_agg)
-        
-        # Create output table
-        pairs_array = np.array(pairs, dtype=object)
-        
-        # Determine variable types based on source column
-        source_var = self._get_variable_by_name(self.source_column)
-        
-        # Create variables for the output table
-        metas = []
-        attributes = []
+        return values, slice_starts, slice_ends, 2 * pair_starts, 2 * pair_ends, pairs_array
+    
+    def _create_output_table(self, source_var, pairs_array, value_vars, values_array):
+        """Build the output table from source pairs and their per-pair values"""
+        values_array = np.ascontiguousarray(values_array, dtype=np.float64)
         
-        # Source columns
+        # Source columns; numeric sources keep float arrays, only string
+        # sources need an object array
         if isinstance(source_var, DiscreteVariable):
             source1_var = DiscreteVariable("Source1", values=source_var.values)
             source2_var = DiscreteVariable("Source2", values=source_var.values)
-            metas.extend([source1_var, source2_var])
+            attributes = list(value_vars)
+            metas = [source1_var, source2_var]
+            X_array = values_array
+            metas_array = pairs_array.astype(np.float64, copy=False)
         elif isinstance(source_var, ContinuousVariable):
             source1_var = ContinuousVariable("Source1")
             source2_var = ContinuousVariable("Source2")
-            attributes.extend([source1_var, source2_var])
+            attributes = [source1_var, source2_var] + list(value_vars)
+            metas = []
+            # Write pairs and values straight into one contiguous float block
+            X_array = np.empty((len(pairs_array), 2 + values_array.shape[1]), dtype=np.float64)
+            X_array[:, :2] = pairs_array
+            X_array[:, 2:] = values_array
+            metas_array = None
         else:
             # String or other type
             source1_var = StringVariable("Source1")
             source2_var = StringVariable("Source2")
-            metas.extend([source1_var, source2_var])
+            attributes = list(value_vars)
+            metas = [source1_var, source2_var]
+            X_array = values_array
+            metas_array = pairs_array.astype(object, copy=False)
         
-        # Aggregated numeric columns
-        for col_name in self.numeric_columns:
-            method = self.aggregation_methods.get(col_name, "mean")
-            var = ContinuousVariable(f"{col_name}_{method}")
-            attributes.append(var)
-        
-        # Prepare data arrays
-        X_data = []
-        metas_data = []
-        
-        for i, pair in enumerate(pairs):
-            row_attrs = []
-            row_metas = []
-            
-            # Handle source columns
-            if isinstance(source_var, StringVariable) or source_var is None:
-                row_metas.extend(pair)
-            elif isinstance(source_var, DiscreteVariable):
-                try:
-                    idx1 = source_var.values.index(str(pair[0]))
-                    idx2 = source_var.values.index(str(pair[1]))
-                    row_metas.extend([idx1, idx2])
-                except ValueError:
-                    row_metas.extend([np.nan, np.nan])
-            else:
-                row_attrs.extend(pair)
-            
-            # Add aggregated values
-            for col_name in self.numeric_columns:
-                row_attrs.append(aggregated_values[col_name][i])
-            
-            X_data.append(row_attrs)
-            metas_data.append(row_metas)
-        
-        # Create domain and table
         domain = Domain(attributes, metas=metas)
         
-        X_array = np.array(X_data, dtype=float) if X_data and X_data[0] else np.empty((len(pairs), 0))
-        metas_array = np.array(metas_data, dtype=object) if metas_data and metas_data[0] else np.empty((len(pairs), 0))
-        
-        output_table = Table.from_numpy(
-            domain=domain,
-            X=X_array,
-            metas=metas_array
-        )
-        
-        return output_table
+        return Table.from_numpy(domain=domain, X=X_array, metas=metas_array)
     
     def _get_variable_by_name(self, name):
         """Helper to get variable object by name"""
-        for attr in self.data.domain.attributes:
-            if attr.name == name:
-                return attr
-        for meta in self.data.domain.metas:
-            if meta.name == name:
-                return meta
-        if self.data.domain.class_var and self.data.domain.class_var.name == name:
-            return self.data.domain.class_var
-        return None
+        if name not in self._col_index:
+            return None
+        return self._col_index[name][2]
 
 
 # For testing purposes
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 from Orange.data import Table, Domain, ContinuousVariable, StringVariable
 from Orange.widgets import widget, gui, settings
 from Orange.widgets.utils.signals import Input, Output
@@ -88,13 +89,8 @@ class OWGeoPreprocessor(widget.OWWidget):
             self.info_label.setText("No data loaded")
             return
 
-        gene = []
-        logfc = []
-        split_count = 0
-        empty_symbol_count = 0
-
         inst_pre = self.data.domain.attributes + self.data.domain.metas
-        inst_attrs = [attr.name for attr in inst_pre]
+        inst_attrs = {attr.name: attr for attr in inst_pre}  # Name -> variable
         print("first_last")
         print(self.select_first)
         first_last = 0 if self.select_first == 0 else -1
@@ -105,37 +101,42 @@ class OWGeoPreprocessor(widget.OWWidget):
             self.processed_data = None
             self.info_label.setText("Invalid input data")
             return
-        
-        for inst in self.data:
-            if len(inst["Gene.symbol"].value) == 0 and self.skip_empty_genes:
-                empty_symbol_count += 1
-            else:
-                gene_symbol = inst["Gene.symbol"].value if "Gene.symbol" in inst_attrs else ""
-                gene_id = inst["Gene.ID"].value if "Gene.ID" in inst_attrs else ""
-
-                # Handle multiple genes separated by delimiter
-                if self.split_delimiter in gene_symbol:
-                    gene_symbol = gene_symbol.split(self.split_delimiter)[first_last].strip()
-                    gene_id = gene_id.split(self.split_delimiter)[first_last].strip()
-                    split_count += 1
-                
-                # Build gene metadata
-                gene.append([
-                    inst["ID"].value if "ID" in inst_attrs else "",
-                    gene_symbol,
-                    inst["Gene.title"].value if "Gene.title" in inst_attrs else "",
-                    gene_id
-                ])
-                
-                # Build expression data
-                logfc_values = []
-                for field in ["adj.P.Val", "P.Value", "t", "B", "logFC"]:
-                    if field in inst_attrs:
-                        logfc_values.append(inst[field].value)
-                    else:
-                        logfc_values.append(0.0)  # Default value if field missing
-                
-                logfc.append(logfc_values)
+
+        # Skip rows with empty Gene.symbol
+        n_rows = len(self.data)
+        gene_symbols = self.get_string_column("Gene.symbol", inst_attrs)
+        if self.skip_empty_genes and "Gene.symbol" in inst_attrs:
+            keep = gene_symbols != ""
+        else:
+            keep = np.ones(n_rows, dtype=bool)
+        n_keep = int(np.count_nonzero(keep))
+        empty_symbol_count = n_rows - n_keep
+
+        # Fill preallocated output arrays with the kept rows of each column
+        gene_array = np.empty((n_keep, 4), dtype=object)
+        gene_array[:, 0] = self.get_string_column("ID", inst_attrs)[keep]
+        gene_array[:, 1] = gene_symbols[keep]
+        gene_array[:, 2] = self.get_string_column("Gene.title", inst_attrs)[keep]
+        gene_array[:, 3] = self.get_string_column("Gene.ID", inst_attrs)[keep]
+
+        logfc = np.zeros((n_keep, 5))  # Default value if field missing
+        for i, field in enumerate(["adj.P.Val", "P.Value", "t", "B", "logFC"]):
+            if field in inst_attrs:
+                logfc[:, i] = self.get_column(inst_attrs[field])[keep]
+
+        # Handle multiple genes separated by delimiter: keep the part before
+        # the first delimiter or after the last one
+        symbols = gene_array[:, 1].astype(str)
+        has_delimiter = np.char.find(symbols, self.split_delimiter) >= 0
+        split_count = int(np.count_nonzero(has_delimiter))
+        if split_count:
+            for i in (1, 3):
+                genes = gene_array[has_delimiter, i].astype(str)
+                if first_last == 0:
+                    genes = np.char.partition(genes, self.split_delimiter)[:, 0]
+                else:
+                    genes = np.char.rpartition(genes, self.split_delimiter)[:, 2]
+                gene_array[has_delimiter, i] = np.char.strip(genes)
 
         info_msgs = []
         # Set warning messages
@@ -145,7 +146,7 @@ class OWGeoPreprocessor(widget.OWWidget):
             info_msgs.append(f"Split {split_count} genes using '{self.split_delimiter}'")
 
         # Create output table
-        if gene and logfc:
+        if len(logfc):
             # Define domain for the output table
             meta_attrs = [
                 StringVariable("ID"),
@@ -164,13 +165,9 @@ class OWGeoPreprocessor(widget.OWWidget):
             
             domain = Domain(continuous_attrs, metas=meta_attrs)
             
-            # Convert to numpy arrays and create table
-            logfc_array = np.array(logfc, dtype=float)
-            gene_array = np.array(gene, dtype=object)
-            
-            self.processed_data = Table.from_numpy(domain, logfc_array, metas=gene_array)
+            self.processed_data = Table.from_numpy(domain, logfc, metas=gene_array)
 
-            msg = f"Processed {len(gene)} genes"
+            msg = f"Processed {len(logfc)} genes"
             if info_msgs:
                 msg += "\n" + "\n".join(info_msgs)
             self.info_label.setText(msg)
@@ -178,6 +175,27 @@ class OWGeoPreprocessor(widget.OWWidget):
             self.processed_data = None
             self.info_label.setText("No valid data to process")
 
+    def get_column(self, var):
+        """Get the values of a column as an array"""
+        if hasattr(self.data, "get_column"):
+            return self.data.get_column(var)
+        return self.data.get_column_view(var)[0]
+
+    def get_string_column(self, name, inst_attrs):
+        """Get a column as an object array of strings ("" when absent or missing)"""
+        var = inst_attrs.get(name)
+        if var is None:
+            return np.full(len(self.data), "", dtype=object)
+
+        values = self.get_column(var)
+        if var.is_string:
+            return np.where(pd.isnull(values), "", values).astype(object)
+        if var.is_discrete:
+            labels = np.array(list(var.values) + [""], dtype=object)
+            codes = np.where(np.isnan(values), len(var.values), values).astype(int)
+            return labels[codes]
+        return np.array(["" if np.isnan(v) else var.str_val(v) for v in values], dtype=object)
+
     ###################################################################
     # Widget Lifecycle Methods
     ###################################################################
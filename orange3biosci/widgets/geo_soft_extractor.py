@@ -1,9 +1,15 @@
 # Orange Widget for GEO SOFT Expression Data Extraction
 
 import os
+import re
+import io
+import csv
 import gzip
-from collections import defaultdict
+import mmap
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import pandas as pd
 from importlib.resources import files
 import urllib.request
 import tempfile
@@ -16,6 +22,17 @@ from Orange.widgets.settings import Setting
 from Orange.widgets import gui
 from Orange.data import Table, Domain, ContinuousVariable, StringVariable, DiscreteVariable
 from Orange.widgets.utils.widgetpreview import WidgetPreview
+from Orange.misc.environ import cache_dir
+
+# Start of the SOFT lines the sample index needs: every '^' entity line and
+# the few '!' records it reads, after any leading whitespace
+SOFT_RECORD_RE = re.compile(
+    rb'[ \t\r\x0b\x0c]*(\^|!(?:Series_platform_taxid|Platform_taxid|Sample_taxid_ch1'
+    rb'|platform_table_begin|Sample_title|Sample_characteristics_ch1|sample_table_begin))'
+)
+# The same, at the start of any later line; the leading newline lets the
+# regex engine skip ahead with a fast literal search
+SOFT_NEXT_RECORD_RE = re.compile(rb'\n' + SOFT_RECORD_RE.pattern)
 
 class OWGeoSoftExtractor(OWWidget):
     name = "GEO SOFT Extractor"
@@ -57,6 +74,17 @@ class OWGeoSoftExtractor(OWWidget):
         self.all_sample_titles = []
         self.all_sample_characteristics_dict = {}
         self.gene_info = {}  # Store combined gene information (Entrez ID and Gene Symbol)
+        self._soft_index = {}  # Sample ID -> [title, characteristics, table start, table end]
+        self._soft_tax_id = None  # Taxonomy ID found while indexing
+        self._soft_header = {}  # Series title, series taxonomy ID and platform table ranges
+        self._soft_buffer = None  # Bytes of the SOFT file, shared while extracting
+        self._soft_titles_lower = {}  # Sample ID -> lowercase title, for substring matching
+        self._soft_index_key = None  # (path, mtime, size) of the indexed file
+        self._sample_tables = {}  # Sample ID -> parsed (gene IDs, values) of the indexed file
+        self._platform_data = None  # Parsed platform annotations of the indexed file
+        self._sample_texts_lower = []  # Lowercase text of each sample list row
+        self._highlighted = []  # Highlight state of each sample list row, None if not set yet
+        self._downloads = {}  # URL -> downloaded temporary file
         
         if self.soft_file_path:
             QTimer.singleShot(0, self._initialize_ui_and_commit)
@@ -132,6 +160,7 @@ class OWGeoSoftExtractor(OWWidget):
         self.log_area = QTextEdit()
         self.log_area.setMaximumHeight(120)
         self.log_area.setReadOnly(True)
+        self.log_area.document().setMaximumBlockCount(500)  # Drop the oldest lines of long logs
         gui.widgetBox(left_panel, "Log").layout().addWidget(self.log_area)
         
         # Progress bar
@@ -357,15 +386,13 @@ class OWGeoSoftExtractor(OWWidget):
         
         # Select all items matching any of the substrings
         matching_count = 0
+        substrings_lower = [substring.lower() for substring in substrings]
         
-        for i in range(self.sample_list.count()):
-            item = self.sample_list.item(i)
-            item_text_lower = item.text().lower()
-            
+        for i, item_text_lower in enumerate(self.sample_texts_lower()):
             # Check if any substring matches
-            for substring in substrings:
-                if substring.lower() in item_text_lower:
-                    item.setSelected(True)
+            for substring in substrings_lower:
+                if substring in item_text_lower:
+                    self.sample_list.item(i).setSelected(True)
                     matching_count += 1
                     break  # No need to check other substrings for this item
                     
@@ -411,9 +438,10 @@ class OWGeoSoftExtractor(OWWidget):
             self.all_sample_titles = sample_titles
             
             # Populate the list widget with inverted format: "Title (GSMxxxxxx)"
-            for sample_id, title in sample_titles:
-                display_text = f"{title} ({sample_id})"
-                self.sample_list.addItem(display_text)
+            display_texts = [f"{title} ({sample_id})" for sample_id, title in sample_titles]
+            self.sample_list.addItems(display_texts)
+            self._sample_texts_lower = [text.lower() for text in display_texts]
+            self._highlighted = [None] * len(display_texts)
                 
             # Populate characteristics list
             self.update_characteristics_list([])
@@ -437,13 +465,15 @@ class OWGeoSoftExtractor(OWWidget):
             temp_path = temp_file.name
             temp_file.close()
             
-            # Download with progress tracking
+            # Download with progress tracking; the bar is only repainted when
+            # the percentage changes, not for every block received
             def reporthook(block_num, block_size, total_size):
                 if total_size > 0:
                     downloaded = block_num * block_size
                     percent = min(int(downloaded * 100 / total_size), 100)
-                    self.progress_bar.setValue(percent)
-                    self.progress_bar.repaint()
+                    if percent != self.progress_bar.value():
+                        self.progress_bar.setValue(percent)
+                        self.progress_bar.repaint()
             
             urllib.request.urlretrieve(url, temp_path, reporthook)
             self.progress_bar.setValue(100)
@@ -455,60 +485,260 @@ class OWGeoSoftExtractor(OWWidget):
             self.progress_bar.setVisible(False)
             return None
     
-    def open_file(self, filename):
-        """Open a file, handling both regular and gzipped files, and URLs"""
-        # Check if it's a URL
+    def fetch_file(self, filename):
+        """Return a local path for filename, downloading URLs to a temporary file"""
         if filename.startswith('http://') or filename.startswith('https://') or filename.startswith('ftp://'):
-            # Download to temporary file first
-            temp_path = self.download_url_to_temp(filename)
-            if temp_path is None:
-                raise Exception("Failed to download file from URL")
+            # Download to temporary file first, once per URL
+            temp_path = self._downloads.get(filename)
+            if temp_path is None or not os.path.exists(temp_path):
+                temp_path = self.download_url_to_temp(filename)
+                if temp_path is None:
+                    raise Exception("Failed to download file from URL")
+                self._downloads[filename] = temp_path
             filename = temp_path
+        return filename
+
+    def read_soft_buffer(self, filename):
+        """Return the raw bytes of a SOFT file.
+        
+        Regular files are memory-mapped, gzipped files are decompressed in memory.
+        """
+        filename = self.fetch_file(filename)
         
         if filename.endswith('.gz'):
-            return gzip.open(filename, 'rt', encoding='utf-8', errors='ignore')
-        else:
-            return open(filename, 'r', encoding='utf-8', errors='ignore')
+            with gzip.open(filename, 'rb') as f:
+                return f.read()
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_soft_buffer(self, filename):
+        """Return the bytes of the SOFT file being extracted, reading it at most once"""
+        if self._soft_buffer is None:
+            self._soft_buffer = self.read_soft_buffer(filename)
+        return self._soft_buffer
+
+    def soft_value(self, line):
+        """Decoded value of a 'key = value' SOFT line, None if it has no '='"""
+        if b'=' not in line:
+            return None
+        # The value ends at a second '=', if any; splitting stops there
+        return line.split(b'=', 2)[1].strip().decode('utf-8', errors='ignore')
+
+    def index_soft_file(self, buffer):
+        """Index the samples of a SOFT buffer in a single scan.
+        
+        Returns a dict of sample ID -> [title, characteristics, table start,
+        table end], with table offsets delimiting the table rows in the
+        buffer, the last taxonomy ID found, and a header dict with the series
+        title, the first series platform taxonomy ID and a list of
+        [platform ID, table start, table end] for each platform.
+        """
+        samples = {}
+        tax_id = None
+        header = {'series_title': None, 'series_taxid': None, 'platforms': []}
+        current = None  # Index entry of the sample whose header is being read
+        pos = 0
+        end = len(buffer)
+        
+        while pos < end:
+            # Jump straight to the next record of interest; all other lines
+            # are skipped by the regex engine
+            record = SOFT_RECORD_RE.match(buffer, pos) or SOFT_NEXT_RECORD_RE.search(buffer, pos)
+            if record is None:
+                break
+            newline = buffer.find(b'\n', record.end())
+            if newline == -1:
+                newline = end
+            line = buffer[record.start(1):newline].strip()
+            pos = newline + 1
+            
+            tag = record.group(1)
+            if tag == b'^':
+                if line.startswith(b'^SAMPLE'):
+                    sample_id = self.soft_value(line)
+                    current = samples.setdefault(sample_id, [None, [], None, None]) if sample_id else None
+                elif line.startswith(b'^PLATFORM'):
+                    header['platforms'].append([self.soft_value(line), None, None])
+                elif line.startswith(b'^SERIES'):
+                    series_title = self.soft_value(line)
+                    if series_title is not None:
+                        header['series_title'] = series_title
+                continue
+            
+            # Check for taxonomy ID
+            if tag in (b'!Series_platform_taxid', b'!Platform_taxid', b'!Sample_taxid_ch1'):
+                tax_id = self.soft_value(line) or tax_id
+                if tag == b'!Series_platform_taxid' and not header['series_taxid']:
+                    header['series_taxid'] = self.soft_value(line)
+                continue
+            
+            # Record where the platform annotation rows are and jump past them
+            if tag == b'!platform_table_begin':
+                table_end = buffer.find(b'\n!platform_table_end', newline)
+                table_end = table_end + 1 if table_end != -1 else end
+                if header['platforms'] and header['platforms'][-1][0]:
+                    header['platforms'][-1][1:] = [min(pos, end), table_end]
+                pos = table_end
+                continue
+            
+            if current is None:
+                continue
+            
+            if tag == b'!Sample_title':
+                current[0] = self.soft_value(line) or ""
+                
+            elif tag == b'!Sample_characteristics_ch1':
+                current[1].append(self.soft_value(line) or "")
+            
+            else:
+                # Record where the table rows are and jump to the end marker
+                # without reading them
+                table_end = buffer.find(b'\n!sample_table_end', newline)
+                current[2] = min(pos, end)
+                current[3] = table_end + 1 if table_end != -1 else None
+                current = None  # stop collecting for this sample
+                pos = table_end + 1 if table_end != -1 else end
+        
+        return samples, tax_id, header
+
+    def soft_file_key(self, file_path):
+        """Key identifying the contents of a SOFT file; URLs are keyed by address only"""
+        if file_path.startswith('http://') or file_path.startswith('https://') or file_path.startswith('ftp://'):
+            return (file_path,)
+        stat = os.stat(file_path)
+        return (file_path, stat.st_mtime_ns, stat.st_size)
+
+    def load_soft_index(self, file_path, shared=False):
+        """Return the sample index of a SOFT file, building it if the file changed.
+        
+        Parsed sample tables and platform data are cached along with the
+        index and dropped whenever it is rebuilt. With shared set, a file
+        that has to be scanned is read into the buffer shared while
+        extracting, so the table parsers do not read it again.
+        """
+        key = self.soft_file_key(file_path)
+        if self._soft_index_key != key:
+            index = self.load_cached_index(key)
+            if index is None:
+                if shared:
+                    buffer = self.get_soft_buffer(file_path)
+                else:
+                    buffer = self.read_soft_buffer(file_path)
+                index = self.index_soft_file(buffer)
+                self.save_cached_index(key, *index)
+            self._soft_index, self._soft_tax_id, self._soft_header = index
+            self._soft_titles_lower = {
+                sample_id: entry[0].lower() for sample_id, entry in self._soft_index.items()
+                if entry[0] is not None
+            }
+            self._soft_index_key = key
+            self._sample_tables = {}
+            self._platform_data = None
+        return self._soft_index
     
+    def index_cache_path(self, key):
+        """Location of the on-disk index of a local SOFT file, None for URLs"""
+        if len(key) != 3:
+            return None
+        digest = hashlib.sha1(os.path.abspath(key[0]).encode('utf-8')).hexdigest()
+        return os.path.join(cache_dir(), "geo_soft_index", digest + ".npz")
+
+    def save_cached_index(self, key, samples, tax_id, header):
+        """Store a sample index on disk, tagged with the key of its source file"""
+        cache_path = self.index_cache_path(key)
+        if cache_path is None:
+            return
+        entries = list(samples.values())
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                np.savez(
+                    f,
+                    source=np.array([key[0]]),
+                    source_stat=np.array(key[1:], dtype=np.int64),
+                    tax_id=np.array([tax_id or ""]),
+                    sample_ids=np.array(list(samples), dtype=str),
+                    titles=np.array([title or "" for title, _, _, _ in entries], dtype=str),
+                    has_title=np.array([title is not None for title, _, _, _ in entries], dtype=bool),
+                    characteristics=np.array([c for _, chars, _, _ in entries for c in chars], dtype=str),
+                    n_characteristics=np.array([len(chars) for _, chars, _, _ in entries], dtype=np.int64),
+                    table_ranges=np.array(
+                        [[-1 if start is None else start, -1 if end is None else end]
+                         for _, _, start, end in entries], dtype=np.int64
+                    ).reshape(-1, 2),
+                    series_title=np.array([header['series_title'] or ""]),
+                    has_series_title=np.array([header['series_title'] is not None]),
+                    series_taxid=np.array([header['series_taxid'] or ""]),
+                    platform_ids=np.array([platform_id or "" for platform_id, _, _ in header['platforms']], dtype=str),
+                    platform_ranges=np.array(
+                        [[-1 if start is None else start, -1 if end is None else end]
+                         for _, start, end in header['platforms']], dtype=np.int64
+                    ).reshape(-1, 2),
+                )
+        except OSError:
+            # The cache is only an optimization
+            pass
+
+    def load_cached_index(self, key):
+        """Return (samples, tax_id, header) stored for the file key, None if missing or stale"""
+        cache_path = self.index_cache_path(key)
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        try:
+            with np.load(cache_path) as data:
+                if data['source'][0] != key[0] or tuple(data['source_stat'].tolist()) != key[1:]:
+                    return None
+                tax_id = str(data['tax_id'][0]) or None
+                characteristics = data['characteristics'].tolist()
+                char_bounds = np.concatenate([[0], np.cumsum(data['n_characteristics'])]).tolist()
+                samples = {}
+                for i, (sample_id, title, has_title, (start, end)) in enumerate(zip(
+                    data['sample_ids'].tolist(), data['titles'].tolist(), data['has_title'].tolist(),
+                    data['table_ranges'].tolist()
+                )):
+                    samples[sample_id] = [
+                        title if has_title else None, characteristics[char_bounds[i]:char_bounds[i + 1]],
+                        None if start == -1 else start, None if end == -1 else end
+                    ]
+                header = {
+                    'series_title': str(data['series_title'][0]) if data['has_series_title'][0] else None,
+                    'series_taxid': str(data['series_taxid'][0]) or None,
+                    'platforms': [
+                        [platform_id or None, None if start == -1 else start, None if end == -1 else end]
+                        for platform_id, (start, end) in zip(
+                            data['platform_ids'].tolist(), data['platform_ranges'].tolist()
+                        )
+                    ],
+                }
+        except (OSError, ValueError, KeyError):
+            return None
+        return samples, tax_id, header
+
     def get_all_sample_titles_and_characteristics(self, filename):
         """Extract all sample titles and unique characteristic from SOFT file"""
-        sample_titles = []
-        sample_characteristics_dict = defaultdict(list)
-        current_sample = None
+        samples = self.load_soft_index(filename)
+        tax_id = self._soft_tax_id
         
-        with self.open_file(filename) as f:
-            for line in f:
-                line = line.strip()
-                
-                # Check for taxonomy ID
-                if line.startswith('!Series_platform_taxid') or line.startswith('!Platform_taxid') or line.startswith('!Sample_taxid_ch1'):
-                    tax_id = line.split('=')[1].strip() if '=' in line else None
-                    if tax_id:
-                        self.taxonomy_id_setting = tax_id
-                        try:
-                            if hasattr(self, 'tax_id_edit'):
-                                self.tax_id_edit.setText(tax_id)
-                        except Exception:
-                            pass
-                
-                if line.startswith('^SAMPLE'):
-                    current_sample = line.split('=')[1].strip() if '=' in line else None
-                    
-                elif current_sample and line.startswith('!Sample_title'):
-                    title = line.split('=')[1].strip() if '=' in line else ""
-                    sample_titles.append((current_sample, title))
-                    
-                elif current_sample and line.startswith('!Sample_characteristics_ch1'):
-                    characteristics = line.split('=')[1].strip() if '=' in line else ""
-                    sample_characteristics_dict[current_sample].append(characteristics)
-
-                elif current_sample and line.startswith('!sample_table_begin'):
-                    current_sample = None # stop collecting for this sample
+        if tax_id:
+            self.taxonomy_id_setting = tax_id
+            try:
+                if hasattr(self, 'tax_id_edit'):
+                    self.tax_id_edit.setText(tax_id)
+            except Exception:
+                pass
+        
+        sample_titles = [
+            (sample, title) for sample, (title, _, _, _) in samples.items() if title is not None
+        ]
                     
         # Now parse all characteristics to get unique labels
         valid_characteristics = set()
         self.all_sample_characteristics_dict = {}
-        for sample, char_list in sample_characteristics_dict.items():
+        for sample, (_, char_list, _, _) in samples.items():
+            if not char_list:
+                continue
             parsed_chars = self.parse_sample_characteristics(char_list)
             self.all_sample_characteristics_dict[sample] = parsed_chars
             for k, v in parsed_chars.items():
@@ -543,15 +773,15 @@ class OWGeoSoftExtractor(OWWidget):
 
     def log_message(self, message):
         self.log_area.append(message)
-        self.log_area.repaint()
+
+    def log_messages(self, messages):
+        """Append several lines to the log in one update"""
+        if messages:
+            self.log_area.append("\n".join(messages))
 
     def parse_platform_data(self, filename):
-        """Extract platform annotation data from SOFT file - using working approach from original code"""
+        """Extract platform annotation data from the platform tables found by the SOFT index"""
         platform_data = {}
-        current_platform = None
-        in_platform_table = False
-        in_table_header = False
-        header_indices = {}
         
         if not self.table_name.strip():
             self.table_name = "GEO Expression Data"
@@ -560,140 +790,31 @@ class OWGeoSoftExtractor(OWWidget):
         self.progress_bar.setValue(0)
         
         try:
-            with self.open_file(filename) as f:
-                lines = f.readlines()
-                total_lines = len(lines)
-                
-                for line_idx, line in enumerate(lines):
-                    # Update progress every 1000 lines
-                    if line_idx % 1000 == 0:
-                        progress = int((line_idx / total_lines) * 100)
-                        self.progress_bar.setValue(progress)
-                        self.progress_bar.repaint()
-                    
-                    line = line.strip()
-                    
-                    if line.startswith('^SERIES'):
-                        self.table_name = line.split('=')[1].strip() if '=' in line else None
-    
-                    # Check for platform start
-                    if line.startswith('^PLATFORM'):
-                        current_platform = line.split('=')[1].strip() if '=' in line else None
-                        in_platform_table = False
-                        in_table_header = False
-                        header_indices = {}
-                        self.log_message(f"Found platform: {current_platform}")
-                        
-                    if line.startswith('!Series_platform_taxid') and not getattr(self, "taxonomy_id_setting", None):
-                        self.taxonomy_id_setting = line.split('=')[1].strip() if '=' in line else self.taxonomy_id_setting
-
-                    # Check for platform table start
-                    elif current_platform and line.startswith('!platform_table_begin'):
-                        in_platform_table = True
-                        in_table_header = True
-                        self.log_message("Started parsing platform table")
-                        continue
-                        
-                    # Check for platform table end
-                    elif line.startswith('!platform_table_end'):
-                        in_platform_table = False
-                        self.log_message("Finished parsing platform table")
-                        
-                    # Parse platform table header
-                    elif in_platform_table and current_platform and in_table_header:
-                        headers = line.split('\t')
-                        in_table_header = False
-                        for idx, header in enumerate(headers):
-                            header_indices[header.strip().lower()] = idx
-                        self.log_message(f"Platform headers: {list(header_indices.keys())}")
-                        
-                    # Parse platform table data
-                    elif in_platform_table and current_platform and line and not line.startswith('!') and not line.startswith('#'):
-                        parts = line.split('\t')
-                        if len(parts) > 0:
-                            probe_id = parts[0].strip()
-
-                            platform_data[probe_id] = {'entrez': '', 'symbol': ''}
-
-                            entrez_id = None
-                            
-                            # Look for Entrez ID in different possible columns (expanded search)
-                            possible_fields = ['gene', 'geneid', 'entrez_gene_id', 'gene_id', 'ncbi_gene_id', 'gene_assignment']
-                            
-                            for field_name in possible_fields:
-                                if field_name in header_indices:
-                                    col_idx = header_indices[field_name]
-                                    if col_idx < len(parts) and parts[col_idx].strip():
-                                        value = parts[col_idx].strip()
-                                        
-                                        if field_name == 'gene_assignment':
-                                            # For gene_assignment, look for Entrez ID in the assignment string
-                                            # Format is often: Symbol // Description // Chromosome // Map Location // Entrez ID // ...
-                                            assignment_parts = value.split('//')
-                                            for i, part in enumerate(assignment_parts):
-                                                part = part.strip()
-                                                # Check if this part looks like an Entrez ID (numeric)
-                                                if part and part.isdigit() and len(part) > 2:
-                                                    entrez_id = part
-                                                    break
-                                            if entrez_id:
-                                                break
-                                        else:
-                                            # For other fields, try to extract numeric Entrez ID
-                                            # Handle multiple values separated by /// or ///
-                                            if '///' in value:
-                                                candidates = value.split('///')
-                                            elif '//' in value:
-                                                candidates = value.split('//')
-                                            else:
-                                                candidates = [value]
-                                            
-                                            for candidate in candidates:
-                                                candidate = candidate.strip()
-                                                # Try to extract just the numeric part
-                                                if candidate.isdigit() and len(candidate) > 2:
-                                                    entrez_id = candidate
-                                                    break
-                                                # Sometimes it's in format like "EntrezGene:12345"
-                                                elif ':' in candidate:
-                                                    parts_colon = candidate.split(':')
-                                                    if len(parts_colon) > 1 and parts_colon[1].strip().isdigit():
-                                                        entrez_id = parts_colon[1].strip()
-                                                        break
-                                            
-                                            if entrez_id:
-                                                break
-                            
-                            if entrez_id:
-                                platform_data[probe_id]['entrez'] = entrez_id
-
-                            # Try to find gene symbol in common fields
-                            possible_symbol_fields = ['gene symbol', 'gene_symbol', 'symbol', 'gene', 'gene_assignment', 'gene_name', 'geneid', 'gene_id', 'gene_title']
-                            gene_symbol = None
-                            for symbol_field in possible_symbol_fields:
-                                if symbol_field in header_indices:
-                                    col_idx = header_indices[symbol_field]
-                                    if col_idx < len(parts) and parts[col_idx].strip():
-                                        value = parts[col_idx].strip()
-                                        # For gene_assignment, symbol is often first part before //
-                                        if symbol_field == 'gene_assignment':
-                                            assignment_parts = value.split('//')
-                                            if assignment_parts:
-                                                gene_symbol = assignment_parts[0].strip()
-                                        else:
-                                            if '///' in value:
-                                                candidates = value.split('///')
-                                            elif '//' in value:
-                                                candidates = value.split('//')
-                                            else:
-                                                candidates = [value]
-                                            gene_symbol = candidates[0].strip()
-                                        break
-                            # You can store or use gene_symbol as needed
-                            if gene_symbol:
-                                platform_data[probe_id]['symbol'] = gene_symbol
+            self.load_soft_index(filename, shared=True)
+            header = self._soft_header
+            
+            if header['series_title'] is not None:
+                self.table_name = header['series_title']
+            if header['series_taxid'] and not getattr(self, "taxonomy_id_setting", None):
+                self.taxonomy_id_setting = header['series_taxid']
+            
+            if self._platform_data is not None:
+                self.log_message("Using platform annotation data parsed earlier")
+                return self._platform_data
+            
+            platforms = header['platforms']
+            for platform_idx, (platform_id, table_start, table_end) in enumerate(platforms):
+                self.log_message(f"Found platform: {platform_id}")
+                if table_start is None:
+                    continue
                 
-                self.progress_bar.setValue(100)
+                self.log_message("Started parsing platform table")
+                self.parse_platform_table(self.get_soft_buffer(filename)[table_start:table_end], platform_data)
+                self.log_message("Finished parsing platform table")
+                self.progress_bar.setValue(int((platform_idx + 1) * 100 / len(platforms)))
+            
+            self._platform_data = platform_data
+            self.progress_bar.setValue(100)
                                 
         except Exception as e:
             self.log_message(f"Error parsing platform data: {str(e)}")
@@ -705,6 +826,107 @@ class OWGeoSoftExtractor(OWWidget):
 
         return platform_data
 
+    def parse_platform_table(self, table_bytes, platform_data):
+        """Add the probe -> Entrez ID / Gene Symbol entries of a platform table to platform_data"""
+        # Decode the whole table once and split it in a single call
+        lines = table_bytes.decode('utf-8', errors='ignore').split('\n')
+        
+        # Parse platform table header
+        header_indices = {}
+        for idx, header in enumerate(lines[0].strip().split('\t')):
+            header_indices[header.strip().lower()] = idx
+        self.log_message(f"Platform headers: {list(header_indices.keys())}")
+        
+        # Look for Entrez ID in different possible columns (expanded search)
+        possible_fields = ['gene', 'geneid', 'entrez_gene_id', 'gene_id', 'ncbi_gene_id', 'gene_assignment']
+        entrez_columns = [
+            (header_indices[field_name], field_name == 'gene_assignment')
+            for field_name in possible_fields if field_name in header_indices
+        ]
+        
+        # Try to find gene symbol in common fields
+        possible_symbol_fields = ['gene symbol', 'gene_symbol', 'symbol', 'gene', 'gene_assignment', 'gene_name', 'geneid', 'gene_id', 'gene_title']
+        symbol_columns = [
+            (header_indices[symbol_field], symbol_field == 'gene_assignment')
+            for symbol_field in possible_symbol_fields if symbol_field in header_indices
+        ]
+        
+        # Only split rows up to the last annotation column used; the long
+        # trailing columns (GO terms, descriptions) are left unsplit
+        max_split = max([col_idx for col_idx, _ in entrez_columns + symbol_columns], default=0) + 1
+        
+        # Parse platform table data
+        for line in lines[1:]:
+            line = line.strip()
+            if not line or line[0] in '!#':
+                continue
+            parts = line.split('\t', max_split)
+            n_parts = len(parts)
+            probe_id = parts[0].strip()
+            
+            entrez_id = None
+            for col_idx, is_assignment in entrez_columns:
+                value = parts[col_idx].strip() if col_idx < n_parts else ''
+                if value:
+                    if value.isdigit():
+                        # A plain numeric ID, the most common case
+                        if len(value) > 2:
+                            entrez_id = value
+                            break
+                        continue
+                    
+                    if is_assignment:
+                        # For gene_assignment, look for Entrez ID in the assignment string
+                        # Format is often: Symbol // Description // Chromosome // Map Location // Entrez ID // ...
+                        for part in value.split('//'):
+                            part = part.strip()
+                            # Check if this part looks like an Entrez ID (numeric)
+                            if part and part.isdigit() and len(part) > 2:
+                                entrez_id = part
+                                break
+                    else:
+                        # For other fields, try to extract numeric Entrez ID
+                        # Handle multiple values separated by /// or //
+                        if '///' in value:
+                            candidates = value.split('///')
+                        elif '//' in value:
+                            candidates = value.split('//')
+                        else:
+                            candidates = [value]
+                        
+                        for candidate in candidates:
+                            candidate = candidate.strip()
+                            # Try to extract just the numeric part
+                            if candidate.isdigit() and len(candidate) > 2:
+                                entrez_id = candidate
+                                break
+                            # Sometimes it's in format like "EntrezGene:12345"
+                            elif ':' in candidate:
+                                parts_colon = candidate.split(':')
+                                if len(parts_colon) > 1 and parts_colon[1].strip().isdigit():
+                                    entrez_id = parts_colon[1].strip()
+                                    break
+                    
+                    if entrez_id:
+                        break
+            
+            gene_symbol = None
+            for col_idx, is_assignment in symbol_columns:
+                value = parts[col_idx].strip() if col_idx < n_parts else ''
+                if value:
+                    if '//' not in value:
+                        gene_symbol = value
+                    # For gene_assignment, symbol is often first part before //
+                    elif is_assignment:
+                        gene_symbol = value.split('//')[0].strip()
+                    elif '///' in value:
+                        gene_symbol = value.split('///')[0].strip()
+                    else:
+                        gene_symbol = value.split('//')[0].strip()
+                    break
+            
+            platform_data[probe_id] = {'entrez': entrez_id or '', 'symbol': gene_symbol or ''}
+
     def parse_soft_file_directly(self, filename, substring_input):
         """Parse SOFT file directly to extract sample info and expression data (handles .soft and .soft.gz)"""
         # Parse the comma-separated substrings
@@ -715,69 +937,93 @@ class OWGeoSoftExtractor(OWWidget):
 
         matching_samples = {}
         sample_characteristics = {}
-        current_sample = None
-        current_sample_title = None
-        in_sample_table = False
-        sample_data = defaultdict(dict)
+        substrings_lower = [substring.lower() for substring in substrings]
         
         try:
-            with self.open_file(filename) as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Check for sample start
-                    if line.startswith('^SAMPLE'):
-                        current_sample = line.split('=')[1].strip() if '=' in line else None
-                        current_sample_title = None
-                        in_sample_table = False
-                        
-                    # Get sample title/description
-                    elif current_sample and line.startswith('!Sample_title'):
-                        title = line.split('=')[1].strip() if '=' in line else ""
-                        # Check if any substring matches this title
-                        title_lower = title.lower()
-                        for substring in substrings:
-                            if substring.lower() in title_lower:
-                                current_sample_title = title
-                                self.log_message(f"Found matching sample: {current_sample} - {title}")
-                                break
-                            
-                    # Get sample characteristics
-                    elif current_sample and current_sample_title and line.startswith('!Sample_characteristics_ch1'):
-                        characteristics = line.split('=')[1].strip() if '=' in line else ""
-                        if current_sample not in sample_characteristics:
-                            sample_characteristics[current_sample] = []
-                        sample_characteristics[current_sample].append(characteristics)
-                        
-                    # Check for table start
-                    elif current_sample and current_sample_title and line.startswith('!sample_table_begin'):
-                        in_sample_table = True
-                        continue
-                        
-                    # Check for table end
-                    elif line.startswith('!sample_table_end'):
-                        in_sample_table = False
-                        if current_sample and current_sample_title:
-                            # Store the sample data
-                            matching_samples[f"{current_sample}"] = dict(sample_data[current_sample])
-                        
-                    # Parse table data
-                    elif in_sample_table and current_sample and current_sample_title:
-                        if line and not line.startswith('!') and not line.startswith('#'):
-                            parts = line.split('\t')
-                            if len(parts) >= 2:
-                                gene_id = parts[0]
-                                try:
-                                    expression_value = float(parts[1])
-                                    sample_data[current_sample][gene_id] = expression_value
-                                except (ValueError, IndexError):
-                                    continue
+            samples = self.load_soft_index(filename, shared=True)
+            matched_ids = []
+            pending = []  # (sample ID, table start, table end) of tables not cached yet
+            
+            # Match the substrings against the cached lowercase titles first
+            candidates = [
+                sample_id for sample_id, title_lower in self._soft_titles_lower.items()
+                if any(substring in title_lower for substring in substrings_lower)
+            ]
+            
+            found_messages = []
+            for sample_id in candidates:
+                title, characteristics, table_start, table_end = samples[sample_id]
+                found_messages.append(f"Found matching sample: {sample_id} - {title}")
+                
+                if characteristics:
+                    sample_characteristics[sample_id] = characteristics
+                if table_start is None or table_end is None:
+                    continue
+                
+                matched_ids.append(sample_id)
+                if sample_id not in self._sample_tables:
+                    pending.append((sample_id, table_start, table_end))
+            self.log_messages(found_messages)
+            
+            # Parse only the rows of the matching samples' tables; the C
+            # reader releases the GIL, so tables are parsed concurrently
+            if pending:
+                buffer = self.get_soft_buffer(filename)
+                with ThreadPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as executor:
+                    tables = executor.map(
+                        lambda item: self.parse_sample_table(buffer[item[1]:item[2]]), pending
+                    )
+                    # Samples of one platform list the same probes; share one
+                    # gene ID array between them instead of keeping a copy of
+                    # every probe ID string per sample. Arrays are only
+                    # compared when their length and end IDs agree
+                    probe_lists = {
+                        self.probe_list_key(gene_ids): gene_ids
+                        for gene_ids, _ in self._sample_tables.values()
+                    }
+                    for (sample_id, _, _), (gene_ids, values) in zip(pending, tables):
+                        key = self.probe_list_key(gene_ids)
+                        probe_list = probe_lists.get(key)
+                        if probe_list is not None and np.array_equal(gene_ids, probe_list):
+                            gene_ids = probe_list
+                        else:
+                            probe_lists[key] = gene_ids
+                        self._sample_tables[sample_id] = (gene_ids, values)
+            
+            for sample_id in matched_ids:
+                matching_samples[sample_id] = self._sample_tables[sample_id]
         except Exception as e:
             self.log_message(f"Error parsing file: {str(e)}")
             return {}, {}
         
         return matching_samples, sample_characteristics
 
+    def probe_list_key(self, gene_ids):
+        """Cheap key of a sample's gene ID array: its length and first and last IDs"""
+        if len(gene_ids) == 0:
+            return (0,)
+        return (len(gene_ids), gene_ids[0], gene_ids[-1])
+
+    def parse_sample_table(self, table_bytes):
+        """Parse the rows of a sample table into gene IDs and expression values.
+        
+        Only the first two columns are read. Rows without a numeric value
+        (the column header, nulls) and comment rows are dropped.
+        """
+        try:
+            table = pd.read_csv(
+                io.BytesIO(table_bytes), sep='\t', header=None, usecols=[0, 1], dtype=str,
+                keep_default_na=False, quoting=csv.QUOTE_NONE, encoding_errors='ignore'
+            )
+        except ValueError:
+            # No rows, or no row with a value column
+            return np.array([], dtype=object), np.array([], dtype=float)
+        
+        gene_ids = table[0].str.strip().to_numpy(dtype=object)
+        values = pd.to_numeric(table[1], errors='coerce').to_numpy(dtype=float)
+        keep = ~np.isnan(values) & (gene_ids != "") & ~table[0].str.match(r'\s*[!#]').to_numpy()
+        return gene_ids[keep], values[keep]
+
     @gui.deferred
     def commit(self):
         """Extract data based on current settings and selections"""
@@ -810,15 +1056,6 @@ class OWGeoSoftExtractor(OWWidget):
         if file_path.endswith('.gz'):
             self.log_message("Detected gzipped file, extracting...")
         
-        # First, parse platform data for Entrez IDs and Gene Symbols
-        self.log_message("Parsing platform annotation data...")
-        self.gene_info = self.parse_platform_data(file_path)
-
-        entrez_count = sum(1 for info in self.gene_info.values() if info['entrez'])
-        symbol_count = sum(1 for info in self.gene_info.values() if info['symbol'])
-        self.log_message(f"Found Entrez IDs for {entrez_count} probes")
-        self.log_message(f"Found Gene Symbols for {symbol_count} probes")
-        
         # Highlight matching samples in the list
         self.highlight_matching_samples()
         
@@ -827,6 +1064,7 @@ class OWGeoSoftExtractor(OWWidget):
         expression_data, sample_characteristics = self.parse_soft_file_directly(file_path, self.sample_substring)
         
         if not expression_data:
+            self._soft_buffer = None
             if len(substrings) == 1:
                 self.log_message(f"No samples found containing substring '{substrings[0]}'")
             else:
@@ -837,19 +1075,32 @@ class OWGeoSoftExtractor(OWWidget):
         
         self.log_message(f"Found {len(expression_data)} matching samples")
         
-        # Get all unique gene IDs
-        all_genes = set()
-        for sample_data in expression_data.values():
-            all_genes.update(sample_data.keys())
-        all_genes = sorted(list(all_genes))
+        # Get all unique gene IDs, sorted; samples mostly share the same
+        # probes, so a hash-based union followed by sorting the (much smaller)
+        # set of unique IDs is cheaper than sorting all IDs of all samples
+        all_genes = np.sort(pd.unique(
+            np.concatenate([gene_ids for gene_ids, _ in expression_data.values()])
+        ))
         
         self.log_message(f"Found {len(all_genes)} genes")
         
-        if not all_genes:
+        if len(all_genes) == 0:
+            self._soft_buffer = None
             self.log_message("No gene expression data found")
             self.Outputs.data.send(None)
             return
         
+        # Parse platform data for Entrez IDs and Gene Symbols, only once
+        # there are samples to annotate
+        self.log_message("Parsing platform annotation data...")
+        self.gene_info = self.parse_platform_data(file_path)
+        self._soft_buffer = None  # Release the file contents shared by both parsers
+
+        entrez_count = sum(1 for info in self.gene_info.values() if info['entrez'])
+        symbol_count = sum(1 for info in self.gene_info.values() if info['symbol'])
+        self.log_message(f"Found Entrez IDs for {entrez_count} probes")
+        self.log_message(f"Found Gene Symbols for {symbol_count} probes")
+        
         # Get selected characteristics
         if self.characteristics_list.count() > 0:
             selected_characteristics = []
@@ -865,6 +1116,15 @@ class OWGeoSoftExtractor(OWWidget):
         # Create Orange Table
         self.create_orange_table(expression_data, all_genes, sample_characteristics, selected_characteristics)
 
+    def sample_texts_lower(self):
+        """Lowercase text of the sample list rows, cached when the list is filled"""
+        if len(self._sample_texts_lower) != self.sample_list.count():
+            self._sample_texts_lower = [
+                self.sample_list.item(i).text().lower() for i in range(self.sample_list.count())
+            ]
+            self._highlighted = [None] * len(self._sample_texts_lower)
+        return self._sample_texts_lower
+
     def highlight_matching_samples(self):
         """Highlight samples in the list that match any of the current substrings"""
         substrings = self.parse_substrings(self.sample_substring)
@@ -872,23 +1132,34 @@ class OWGeoSoftExtractor(OWWidget):
         if not substrings:
             return
         
-        for i in range(self.sample_list.count()):
-            item = self.sample_list.item(i)
-            item_text_lower = item.text().lower()
-            
-            # Check if any substring matches
-            matches = False
-            for substring in substrings:
-                if substring.lower() in item_text_lower:
-                    matches = True
-                    break
-            
-            if matches:
-                item.setBackground(item.listWidget().palette().highlight())
-                item.setForeground(item.listWidget().palette().highlightedText())
-            else:
-                item.setBackground(item.listWidget().palette().base())
-                item.setForeground(item.listWidget().palette().text())
+        substrings_lower = [substring.lower() for substring in substrings]
+        palette = self.sample_list.palette()
+        highlight, highlighted_text = palette.highlight(), palette.highlightedText()
+        base, text = palette.base(), palette.text()
+        
+        self.sample_list.setUpdatesEnabled(False)
+        try:
+            for i, item_text_lower in enumerate(self.sample_texts_lower()):
+                # Check if any substring matches
+                matches = False
+                for substring in substrings_lower:
+                    if substring in item_text_lower:
+                        matches = True
+                        break
+                
+                # Only restyle rows whose highlight state changed
+                if matches == self._highlighted[i]:
+                    continue
+                self._highlighted[i] = matches
+                item = self.sample_list.item(i)
+                if matches:
+                    item.setBackground(highlight)
+                    item.setForeground(highlighted_text)
+                else:
+                    item.setBackground(base)
+                    item.setForeground(text)
+        finally:
+            self.sample_list.setUpdatesEnabled(True)
 
     def create_orange_table(self, expression_data, all_genes, sample_characteristics, selected_characteristics=None):
         """Convert expression data to Orange Table format"""
@@ -899,6 +1170,7 @@ class OWGeoSoftExtractor(OWWidget):
         
         # Create continuous variables for each sample with parsed characteristics as separate attributes
         attributes = []
+        characteristics_messages = []
         for sample_name in sample_names:
             var = ContinuousVariable(sample_name)
             
@@ -917,9 +1189,10 @@ class OWGeoSoftExtractor(OWWidget):
                 # Set each characteristic as a separate variable attribute
                 if parsed_chars:
                     var.attributes = parsed_chars
-                    self.log_message(f"Sample {sample_name} characteristics: {list(parsed_chars.keys())}")
+                    characteristics_messages.append(f"Sample {sample_name} characteristics: {list(parsed_chars.keys())}")
             
             attributes.append(var)
+        self.log_messages(characteristics_messages)
         
         # Gene ID as "genes", Gene Symbol, and Entrez ID as meta attributes
         metas = [StringVariable("genes"), StringVariable("Gene Symbol"), StringVariable("Entrez ID")]
@@ -933,48 +1206,35 @@ class OWGeoSoftExtractor(OWWidget):
         
         X = np.full((n_genes, n_samples), np.nan)
         
-        # Fill expression values
+        # Fill expression values, one sample column at a time; the row of
+        # each gene is looked up in a hash index over all_genes. Samples of
+        # one platform usually share the same probe ID array, so the rows
+        # of the previous sample are reused when the IDs match
+        gene_rows = pd.Index(all_genes)
+        previous_ids, rows = None, None
         for sample_idx, sample_name in enumerate(sample_names):
-            sample_data = expression_data[sample_name]
-            for gene_idx, gene_id in enumerate(all_genes):
-                if gene_id in sample_data:
-                    value = sample_data[gene_id]
-                    # Apply log2 transformation if requested
-                    if self.transform_log2:
-                        try:
-                            # Transform from log2 to actual value: 2^x
-                            value = 2 ** value
-                        except (OverflowError, ValueError):
-                            # Handle potential overflow or invalid values
-                            value = np.nan
-                    X[gene_idx, sample_idx] = value
-        
-        # Create meta data (gene IDs, Gene Symbols, and Entrez IDs)
-        gene_ids = []
-        gene_symbol_list = []
-        entrez_ids = []
-        
-        for gene_id in all_genes:
-            gene_ids.append(gene_id if gene_id else "?")
-            
-            # Get gene info from the dictionary
-            if gene_id in self.gene_info:
-                sym = self.gene_info[gene_id].get('symbol', "")
-                ent = self.gene_info[gene_id].get('entrez', "")
-                gene_symbol_list.append(sym if sym else "?")
-                entrez_ids.append(ent if ent else "?")
-            else:
-                gene_symbol_list.append("?")
-                entrez_ids.append("?")
-        
-        gene_ids_array = np.array(gene_ids, dtype=object).reshape(-1, 1)
-        gene_symbol_array = np.array(gene_symbol_list, dtype=object).reshape(-1, 1)
-        entrez_ids_array = np.array(entrez_ids, dtype=object).reshape(-1, 1)
-        metas_data = np.hstack([gene_ids_array, gene_symbol_array, entrez_ids_array])
+            gene_ids, values = expression_data[sample_name]
+            if gene_ids is not previous_ids and not np.array_equal(gene_ids, previous_ids):
+                previous_ids, rows = gene_ids, gene_rows.get_indexer(gene_ids)
+            X[rows, sample_idx] = values
         
-        # Post-processing: replacing any remaining empty values with '?' symbol
-        metas_data[metas_data == ""] = "?"
-        metas_data[metas_data == None] = "?"
+        # Apply log2 transformation if requested, in place on the whole matrix
+        if self.transform_log2:
+            # Transform from log2 to actual value: 2^x, overflow gives NaN
+            finite = np.isfinite(X)
+            with np.errstate(over='ignore'):
+                np.exp2(X, out=X)
+            X[np.isinf(X) & finite] = np.nan
+        
+        # Create meta data (gene IDs, Gene Symbols, and Entrez IDs), with
+        # '?' for empty values
+        gene_ids = all_genes.tolist()
+        no_info = {}
+        gene_info = [self.gene_info.get(gene_id, no_info) for gene_id in gene_ids]
+        metas_data = np.empty((n_genes, 3), dtype=object)
+        metas_data[:, 0] = [gene_id or "?" for gene_id in gene_ids]
+        metas_data[:, 1] = [info.get('symbol') or "?" for info in gene_info]
+        metas_data[:, 2] = [info.get('entrez') or "?" for info in gene_info]
         
         # Create Orange Table
         table = Table.from_numpy(domain, X, metas=metas_data)
@@ -998,9 +1258,9 @@ class OWGeoSoftExtractor(OWWidget):
         
         self.log_message(f"Created Orange Table '{table.name}': {n_genes} genes x {n_samples} samples")
         self.log_message(f"Non-missing values: {np.count_nonzero(~np.isnan(X))}")
-        entrez_count = np.count_nonzero([e for e in entrez_ids if e])
+        entrez_count = np.count_nonzero(metas_data[:, 2] != "?")
         self.log_message(f"Genes with Entrez IDs in output: {entrez_count}")
-        symbol_count = np.count_nonzero([s for s in gene_symbol_list if s])
+        symbol_count = np.count_nonzero(metas_data[:, 1] != "?")
         self.log_message(f"Genes with Symbols in output: {symbol_count}")
         if self.transform_log2:
             self.log_message("Applied log2 to actual value transformation (2^x)")